@@ -21,11 +21,12 @@ STATE_ADDR_L        = 3
 STATE_DATA          = 4
 STATE_NO_DATA       = 5
 
-# supported commands by the VPC3 Profibus ASIC
-SPI_MEMORY_CMD_READ_BYTE                                    = b'\x13'             
-SPI_MEMORY_CMD_READ_ARRAY                                   = b'\x03'             
-SPI_MEMORY_CMD_WRITE_BYTE                                   = b'\x12'             
-SPI_MEMORY_CMD_WRITE_ARRAY                                  = b'\x02' 
+# supported commands by the VPC3 Profibus ASIC; kept as plain ints so lookups
+# index on the raw byte value instead of hashing a one-byte bytes object
+SPI_MEMORY_CMD_READ_BYTE                                    = 0x13
+SPI_MEMORY_CMD_READ_ARRAY                                   = 0x03
+SPI_MEMORY_CMD_WRITE_BYTE                                   = 0x12
+SPI_MEMORY_CMD_WRITE_ARRAY                                  = 0x02
 
 IDX_CMD_NAME            = 0
 IDX_NEXT_STATE          = 1
@@ -44,15 +45,19 @@ frame_config = {
     SPI_MEMORY_CMD_WRITE_ARRAY                              : ["Write Array"                                    ,STATE_ADDR_H           ,STATE_DATA             ,'WRITE_ARRAY'                                  ,'mosi'        ],
 }
 
+# dense table indexed by the command byte value --> a plain list index instead of
+# a dict lookup; unknown commands stay None
+FRAME_TABLE = [None] * 256
+for i in frame_config:
+    FRAME_TABLE[i] = tuple(frame_config[i])
+
 # High level analyzers must subclass the HighLevelAnalyzer class.
 class HLA_SPI_MEMORY(HighLevelAnalyzer):
   
-    filter_strings = ["no filter"]
-    for i in frame_config:
-        filter_strings.append(frame_config[i][IDX_FILTER])
-    filter_strings.append('Timing_Violations')
-    filter_strings.append('Address');
-  
+    # the filter names from frame_config plus the special modes; static, so keep it
+    # a plain tuple literal instead of building a list at import time
+    filter_strings = ('no filter', 'READ_BYTE', 'READ_ARRAY', 'WRITE_BYTE', 'WRITE_ARRAY', 'Timing_Violations', 'Address')
+
     filter_setting = ChoicesSetting(label='Filter settings', choices=(
                         filter_strings
                     ))
@@ -69,230 +74,289 @@ class HLA_SPI_MEMORY(HighLevelAnalyzer):
         'TimingViolation': {'format': 'violation:  {{data.delta_ns}} > {{data.maxTiming}}'},
     }
 
+    # declare the full attribute set up front --> no per-instance __dict__ from this
+    # class and faster attribute access in decode (the base class may still carry a
+    # __dict__ of its own, in which case this at least documents the attribute set)
+    __slots__ = (
+        'state', 'command', 'address', 'data_chunks', 'data_byte_cnt',
+        'showInstruction', 'timingViolation',
+        'last_cs_asserted', 'last_cs_deasserted',
+        'last_start_time_byte', 'last_end_time_byte',
+        'cmd_frame_start', 'cmd_frame_end',
+        'address_frame_start', 'address_frame_end',
+        'data_frame_start', 'data_frame_end',
+        '_mode', '_addr_filter_val',
+        '_thr_cs_first', '_thr_b_b', '_thr_last_cs',
+        '_thr_cs_first_s', '_thr_b_b_s', '_thr_last_cs_s',
+        '_thr_s_by_state', '_thr_by_state',
+        '_show_cmd_table', '_dispatch',
+        '_cmd_name', '_next_state', '_last_state', '_data_line',
+    )
+
     def __init__(self):
-        print("### Settings ###")
-        print('    filter: ', self.filter_setting)
-        print('    address filter: ', self.address_setting)
-        print('    mark command only: ', self.highlight_cmd_only)
-        print('    cs to byte [ns]: ', int(self.timeCsToFirstByte))
-        print('    byte to byte: ', int(self.timeByteToByte))
-        print('    byte to cs: ', int(self.timelastByteToCs))
-        state = STATE_START
-
-    def cmd_to_str(self, command):
-        try:
-            return frame_config[command][IDX_CMD_NAME]
-        except:
-          return 'Unknown'     
-      
-    def get_next_state(self, command):
-        try:
-            return frame_config[command][IDX_NEXT_STATE]
-        except:
-          return STATE_NO_DATA       
-               
-    def get_last_state(self, command):
+        if __debug__:
+            print("### Settings ###")
+            print('    filter: ', self.filter_setting)
+            print('    address filter: ', self.address_setting)
+            print('    mark command only: ', self.highlight_cmd_only)
+            print('    cs to byte [ns]: ', int(self.timeCsToFirstByte))
+            print('    byte to byte: ', int(self.timeByteToByte))
+            print('    byte to cs: ', int(self.timelastByteToCs))
+
+        # create every decode attribute here (the old code assigned a discarded
+        # local `state` instead of self.state) so decode never creates attributes
+        # on the fly and a stray result frame before the first enable is harmless
+        self.state = STATE_START
+        self.command = 0
+        self.address = 0
+        self.data_chunks = []
+        self.data_byte_cnt = 0
+        self.showInstruction = 0
+        self.timingViolation = 'violation'
+        self.last_cs_asserted = 0
+        self.last_cs_deasserted = 0
+        self.last_start_time_byte = 0
+        self.last_end_time_byte = 0
+        self.cmd_frame_start = 0
+        self.cmd_frame_end = 0
+        self.address_frame_start = 0
+        self.address_frame_end = 0
+        self.data_frame_start = 0
+        self.data_frame_end = 0
+        self._cmd_name = 'Unknown'
+        self._next_state = STATE_NO_DATA
+        self._last_state = STATE_NO_DATA
+        self._data_line = 'mosi'
+
+        # resolve the filter setting into an int once --> decode branches on this
+        # instead of comparing strings for every SPI byte
+        if self.filter_setting == 'no filter':
+            self._mode = 0
+        elif self.filter_setting == 'Timing_Violations':
+            self._mode = 1
+        elif self.filter_setting == 'Address':
+            self._mode = 2
+        else:
+            self._mode = 3
+        # parse the address filter string once; an empty or malformed setting simply
+        # never matches instead of raising per CS-deassert
         try:
-            return frame_config[command][IDX_LAST_STATE]
+            self._addr_filter_val = int(self.address_setting, 0)
         except:
-          return STATE_NO_DATA  
-          
-    def calc_delta(self, timestampStart, timeStampEnd):
-        if timestampStart == 0:
-            return 0
-        delta = timeStampEnd - timestampStart
-        return (delta.__float__() * 1e09)
-    
-    def show_cmd(self, filter_name, command):
-        if filter_name == 'no filter':
-            return 1
-        elif filter_name == 'Timing_Violations':
-            return 0
-        elif filter_name == frame_config[command][IDX_FILTER]:
-            return 1
-        elif filter_name == 'Address':
-            return 3
+            self._addr_filter_val = None
+
+        # timing thresholds read from the NumberSetting descriptors once; the
+        # seconds values keep the full float precision for the per-byte
+        # comparisons, the int ns values only feed the maxTiming report fields
+        self._thr_cs_first_s = float(self.timeCsToFirstByte) * 1e-09
+        self._thr_b_b_s = float(self.timeByteToByte) * 1e-09
+        self._thr_last_cs_s = float(self.timelastByteToCs) * 1e-09
+        self._thr_cs_first = int(self.timeCsToFirstByte)
+        self._thr_b_b = int(self.timeByteToByte)
+        self._thr_last_cs = int(self.timelastByteToCs)
+
+        # thresholds for the single per-byte check in _on_result, indexed by the
+        # state the byte arrives in: a command byte measures from CS assert, all
+        # later bytes from the end of the previous byte
+        self._thr_s_by_state = [0.0, self._thr_cs_first_s, self._thr_b_b_s, self._thr_b_b_s, self._thr_b_b_s, 0.0]
+        self._thr_by_state = [0, self._thr_cs_first, self._thr_b_b, self._thr_b_b, self._thr_b_b, 0]
+
+        # filter_setting and frame_config are fixed for the whole session, so the
+        # old show_cmd if/elif ladder can be precomputed per command byte
+        if self._mode == 0:
+            default = 1
+        elif self._mode == 1:
+            default = 0
+        elif self._mode == 2:
+            default = 3
         else:
-            return 2
-
-    def indicate_violation(self, maxTiming, delta, framestart, frameend, start_time, end_time):
-        self.last_end_time_byte = end_time
-        self.last_start_time_byte = start_time 
-        
-        return AnalyzerFrame('TimingViolation',
-            framestart,
-            frameend, {
-            'delta_ns': int(delta),
-            'maxTiming' : int(maxTiming)
-        })
+            default = 2
+        self._show_cmd_table = [default] * 256
+        if self._mode == 3:
+            for i in frame_config:
+                if self.filter_setting == frame_config[i][IDX_FILTER]:
+                    self._show_cmd_table[i] = 1
 
-    def decode(self, frame: AnalyzerFrame):
-        # SPI frame types are: enable, result and disable
-        # see https://support.saleae.com/extensions/analyzer-frame-types/spi-analyzer for further information
-        
-        # enable --> CS changes from inactive to active
-        # result --> data exchange = the phase where CS is active
-        # disable --> CS changes from active to inactive
+        # dispatch on the SPI frame type with one dict lookup instead of an
+        # if/elif chain of string compares in decode
+        self._dispatch = {
+            'enable'    : self._on_enable,
+            'result'    : self._on_result,
+            'disable'   : self._on_disable,
+        }
+
+    ############################
+    # CHIP SELECT ASSERTED
+    ############################
+    def _on_enable(self, frame):
+        self.state = STATE_CMD
+
+        # keep track when CS was asserted --> frame.start_time and frame.end_time are equal for this
+        # frame type, so you can use any of them
+        self.last_cs_asserted = frame.start_time
+
+        # initialize variables
+        self.last_start_time_byte = 0
+        self.last_end_time_byte = 0
+        self.last_cs_deasserted = 0
+        #self.data_frame_start = frame.start_time
+        #self.data_frame_end = frame.end_time
+
+    def _on_result(self, frame):
+        # transactions filtered out at the command byte park the state machine in
+        # STATE_NO_DATA; skip their remaining bytes entirely (timing mode still
+        # needs to see every byte)
+        if self.state == STATE_NO_DATA and self._mode != 1:
+            return None
+
+        # one timing-violation check per byte: reference point and threshold depend
+        # only on the state the byte arrives in, so the per-state copies of this
+        # block collapse into a single table-driven one
+        in_state = self.state
+        violation = None
+        # STATE_START means no enable has been seen yet, so there is no valid
+        # reference time stamp to measure from
+        if self._mode == 1 and in_state != STATE_NO_DATA and in_state != STATE_START:
+            ref = self.last_cs_asserted if in_state == STATE_CMD else self.last_end_time_byte
+            delta_s = float(frame.start_time - ref)
+            if delta_s > self._thr_s_by_state[in_state]:
+                violation = AnalyzerFrame('TimingViolation',
+                    ref,
+                    frame.start_time, {
+                    'delta_ns': int(delta_s * 1e09),
+                    'maxTiming' : self._thr_by_state[in_state]
+                })
 
         ############################
-        # CHIP SELECT ASSERTED
-        ############################ 
-        if frame.type == 'enable':
-            self.state = STATE_CMD
-      
-            # keep track when CS was asserted --> frame.start_time and frame.end_time are equal for this 
-            # frame type, so you can use any of them
-            self.last_cs_asserted = frame.start_time
-
-            # initialize variables
-            self.last_start_time_byte = 0
-            self.last_end_time_byte = 0
-            self.last_cs_deasserted = 0
-            #self.data_frame_start = frame.start_time
-            #self.data_frame_end = frame.end_time
-        elif frame.type == 'result':
-            ############################
-            # COMMAND/INSTRUCTION
-            ############################        
-            if self.state == STATE_CMD:
-                self.command = frame.data['mosi'] 
-                self.address = None              
-                self.data = b''                
-                self.data_byte_cnt = 0
-                self.showInstruction = 1
-                self.timingViolation = 'violation'
-                self.last_end_time_byte = frame.end_time
-                self.last_start_time_byte = frame.start_time
-                
+        # COMMAND/INSTRUCTION
+        ############################
+        if in_state == STATE_CMD:
+            self.command = frame.data['mosi'][0]
+            self.address = None
+            self.data_chunks = []
+            self.data_byte_cnt = 0
+            self.showInstruction = 1
+            self.timingViolation = 'violation'
+
+            # the command frame bounds are never emitted in timing mode
+            if self._mode != 1:
                 self.cmd_frame_start = frame.start_time;
                 self.cmd_frame_end = frame.end_time;
-                
-              
-                # get the proper state according to the received command      
-                self.state = self.get_next_state(self.command)
-        
-                self.showInstruction = self.show_cmd(self.filter_setting, self.command);
-                if self.showInstruction == 2:
-                    self.showInstruction = 0
-                    self.state = STATE_NO_DATA
-                elif self.showInstruction == 3:
-                    self.showInstruction = 0
-            
-                if self.showInstruction == 1:   
-#                    return AnalyzerFrame('Command', frame.start_time, frame.end_time, {
-#                        'command': self.cmd_to_str(self.command)
-#                    })
-                    pass
-                else:
-                    if self.filter_setting == 'Timing_Violations':
-                        delta = self.calc_delta(self.last_cs_asserted, self.last_start_time_byte)
-                        if delta > self.timeCsToFirstByte:
-                            return self.indicate_violation(self.timeCsToFirstByte, delta, self.last_cs_asserted, self.last_start_time_byte, frame.start_time, frame.end_time)        
-            ############################
-            # ADDRESS
-            ############################        
-            elif self.state == STATE_ADDR_H:
-                self.address_frame_start = frame.start_time
-
-                self.state = STATE_ADDR_L           
-                self.address = int.from_bytes(frame.data['mosi'], 'big') << 8
-                
-                # now we check for timing violations if the proper filter is set
-                if self.filter_setting == 'Timing_Violations':
-                    delta = self.calc_delta(self.last_end_time_byte, frame.start_time)
-                    if delta > self.timeByteToByte:
-                        return self.indicate_violation(self.timeByteToByte, delta, self.last_end_time_byte, frame.start_time, frame.start_time, frame.end_time)    
-          
-                # keep track of the time stamps used for calculating timing violations
-                self.last_end_time_byte = frame.end_time
-                self.last_start_time_byte = frame.start_time                 
-                    
-            elif self.state == STATE_ADDR_L:
-                self.address = self.address | int.from_bytes(frame.data['mosi'], 'big')
-                self.state = self.get_last_state(self.command)
-                self.data_byte_cnt = 0
-                self.address_frame_end = frame.end_time
-                
-                # now we check for timing violations if the proper filter is set
-                if self.filter_setting == 'Timing_Violations':
-                    delta = self.calc_delta(self.last_end_time_byte, frame.start_time)
-                    if delta > self.timeByteToByte:
-                        return self.indicate_violation(self.timeByteToByte, delta, self.last_end_time_byte, frame.start_time, frame.start_time, frame.end_time)    
-          
-                # keep track of the time stamps used for calculating timing violations
-                self.last_end_time_byte = frame.end_time
-                self.last_start_time_byte = frame.start_time  
-            ############################
-            # DATA
-            ############################        
-            elif self.state == STATE_DATA:                
-                if self.data_byte_cnt == 0:             
-                    self.data_frame_start = frame.start_time                   
-                    
-                self.data_byte_cnt += 1
-                self.data += frame.data[frame_config[self.command][IDX_DATA_LINE]]
-                self.data_frame_end = frame.end_time
-                
-                # now we check for timing violations if the proper filter is set
-                if self.filter_setting == 'Timing_Violations':
-                    delta = self.calc_delta(self.last_end_time_byte, frame.start_time)
-                    if delta > self.timeByteToByte:
-                        return self.indicate_violation(self.timeByteToByte, delta, self.last_end_time_byte, frame.start_time, frame.start_time, frame.end_time)    
-          
-                # keep track of the time stamps used for calculating timing violations
-                self.last_end_time_byte = frame.end_time
-                self.last_start_time_byte = frame.start_time  
+
+            # resolve the command configuration once here so the per-byte states
+            # can use plain attributes instead of dict lookups
+            cfg = FRAME_TABLE[self.command]
+            if cfg is not None:
+                self._cmd_name = cfg[IDX_CMD_NAME]
+                self._next_state = cfg[IDX_NEXT_STATE]
+                self._last_state = cfg[IDX_LAST_STATE]
+                self._data_line = cfg[IDX_DATA_LINE]
+            else:
+                self._cmd_name = 'Unknown'
+                self._next_state = STATE_NO_DATA
+                self._last_state = STATE_NO_DATA
+                self._data_line = 'mosi'
+
+            # get the proper state according to the received command
+            self.state = self._next_state
+
+            self.showInstruction = self._show_cmd_table[self.command]
+            if self.showInstruction == 2:
+                self.showInstruction = 0
+                self.state = STATE_NO_DATA
+            elif self.showInstruction == 3:
+                self.showInstruction = 0
+        ############################
+        # ADDRESS
         ############################
-        # CHIP SELECT DEASSERTED
-        ############################ 
-        elif frame.type == 'disable':
-            frames = []
-            
-            self.last_cs_deasserted = frame.start_time
-            if self.filter_setting == 'Timing_Violations':
-                delta = self.calc_delta(self.last_end_time_byte, self.last_cs_deasserted)
-                if delta > self.timelastByteToCs:
-                    return self.indicate_violation(self.timelastByteToCs, delta, self.last_end_time_byte, self.last_cs_deasserted, frame.start_time, frame.end_time)      
+        elif in_state == STATE_ADDR_H:
+            self.address_frame_start = frame.start_time
+
+            self.state = STATE_ADDR_L
+            # each SPI result frame carries exactly one byte, so subscripting is
+            # enough and skips the int.from_bytes call
+            self.address = frame.data['mosi'][0] << 8
+        elif in_state == STATE_ADDR_L:
+            self.address = self.address | frame.data['mosi'][0]
+            self.state = self._last_state
+            self.data_byte_cnt = 0
+            self.address_frame_end = frame.end_time
+        ############################
+        # DATA
+        ############################
+        elif in_state == STATE_DATA:
+            if self.data_byte_cnt == 0:
+                self.data_frame_start = frame.start_time
+
+            self.data_byte_cnt += 1
+            self.data_chunks.append(frame.data[self._data_line])
+            self.data_frame_end = frame.end_time
+
+        # keep track of the time stamps used for calculating timing violations
+        if self._mode == 1 and in_state != STATE_NO_DATA and in_state != STATE_START:
+            self.last_end_time_byte = frame.end_time
+            self.last_start_time_byte = frame.start_time
+
+        return violation
+
+    ############################
+    # CHIP SELECT DEASSERTED
+    ############################
+    def _on_disable(self, frame):
+        self.last_cs_deasserted = frame.start_time
+        if self._mode == 1:
+            # last_end_time_byte stays 0 when CS pulses without any byte
+            if self.last_end_time_byte != 0:
+                # the violation frame spans last-byte-end --> CS deassert, so grab
+                # the reference before the bookkeeping overwrites it
+                ref = self.last_end_time_byte
+                delta_s = float(self.last_cs_deasserted - ref)
+                if delta_s > self._thr_last_cs_s:
+                    self.last_end_time_byte = frame.end_time
+                    self.last_start_time_byte = frame.start_time
+                    return AnalyzerFrame('TimingViolation',
+                        ref,
+                        self.last_cs_deasserted, {
+                        'delta_ns': int(delta_s * 1e09),
+                        'maxTiming' : self._thr_last_cs
+                    })
+        else:
+            if self.state == STATE_DATA:
+                # the address-filter decision is identical for both emit styles, so
+                # make it once instead of duplicating it per highlight_cmd_only branch
+                if self._mode == 2 and self._addr_filter_val != self.address:
+                    return None
+
+                if self.highlight_cmd_only == 'yes':
+                    return AnalyzerFrame('Command', self.cmd_frame_start, self.cmd_frame_end, {
+                        'command': self._cmd_name
+                    })
+
+                # build the result list only on the path that actually emits it
+                return [
+                    AnalyzerFrame('Command', self.cmd_frame_start, self.cmd_frame_end, {
+                        'command': self._cmd_name
+                    }),
+                    AnalyzerFrame('Address', self.address_frame_start, self.address_frame_end, {
+                        'address': self.address,
+                        'addressHex': f'0x{self.address:04x}'
+                    }),
+                    AnalyzerFrame('Data',
+                        self.data_frame_start,
+                        self.data_frame_end, {
+                        'data': b''.join(self.data_chunks)
+                    }),
+                ]
             else:
-                if self.state == STATE_DATA:
-                    if self.highlight_cmd_only == 'yes':
-                        if self.filter_setting == 'Address':
-                            if int(self.address_setting, 0) == self.address:
-                                self.showInfo = 1
-                            else:
-                                self.showInfo = 0
-                        else:
-                            self.showInfo = 1
-                                
-                        if self.showInfo == 1:    
-                            return AnalyzerFrame('Command', self.cmd_frame_start, self.cmd_frame_end, {
-                                'command': self.cmd_to_str(self.command)
-                            })  
-                    else:
-                        if self.filter_setting == 'Address':
-                            if int(self.address_setting, 0) == self.address:
-                                self.showInfo = 1
-                            else:
-                                self.showInfo = 0
-                        else:
-                            self.showInfo = 1
-                        
-                        if self.showInfo == 1:  
-                            frames.append(AnalyzerFrame('Command', self.cmd_frame_start, self.cmd_frame_end, {
-                                'command': self.cmd_to_str(self.command)
-                            }))
-                            
-                            frames.append(AnalyzerFrame('Address', self.address_frame_start, self.address_frame_end, {
-                                'address': self.address,
-                                'addressHex': hex(self.address)    
-                            }))
-                             
-                            frames.append(AnalyzerFrame('Data',
-                                self.data_frame_start,
-                                self.data_frame_end, {
-                                'data': self.data
-                            }))
-                            
-                            return frames
-                else:
-                    pass
+                pass
+
+    def decode(self, frame: AnalyzerFrame):
+        # SPI frame types are: enable, result and disable
+        # see https://support.saleae.com/extensions/analyzer-frame-types/spi-analyzer for further information
+
+        # enable --> CS changes from inactive to active
+        # result --> data exchange = the phase where CS is active
+        # disable --> CS changes from active to inactive
+        handler = self._dispatch.get(frame.type)
+        if handler is not None:
+            return handler(frame)